@@ -5,8 +5,11 @@ import yfinance as yf
 import plotly.express as px
 from datetime import datetime, timedelta
 import os
-from utils.charts import plot_efficient_frontier, plot_allocation, plot_backtesting_results
+from utils.charts import plot_efficient_frontier, plot_allocation, plot_backtesting_results, plot_return_histogram
 from utils.backtesting import run_backtest  # Add this import
+from utils.risk import portfolio_returns, rolling_var_report, rolling_component_var
+from utils.portfolio_optimization import random_portfolio_cloud
+from utils.aggregation import periodic_return_tables, join_strategy_returns
 
 # Page config
 st.set_page_config(
@@ -38,6 +41,8 @@ if st.sidebar.checkbox("Risk Parity", value=False):
     models_selected.append("Risk Parity")
 if st.sidebar.checkbox("Hierarchical Risk Parity", value=False):
     models_selected.append("Hierarchical Risk Parity")
+if st.sidebar.checkbox("Minimum CVaR", value=False):
+    models_selected.append("Minimum CVaR")
 
 # Limit the number of selected models to a maximum of 3
 if len(models_selected) > 3:
@@ -98,6 +103,23 @@ def load_weights(method):
 def load_returns():
     return pd.read_csv("data/selected_stock_daily_returns.csv", parse_dates=["Date"])
 
+# Random portfolio cloud for the latest one-year window, sampled once per session
+@st.cache_data
+def load_frontier_cloud(include_rf):
+    returns_df = load_returns()
+    returns_df = returns_df[returns_df['Ticker'] != '^GSPC']
+    returns_wide = returns_df.pivot_table(index='Date', columns='Ticker', values='Daily Return').iloc[-252:]
+    risk_free_rate = 0.02 / 252 if include_rf else 0.0
+    return random_portfolio_cloud(returns_wide.mean(), returns_wide.cov(), risk_free_rate=risk_free_rate)
+
+
+# Monthly/quarterly/yearly asset returns, built once; the Backtesting tab adds the strategies
+@st.cache_data
+def load_periodic_tables():
+    return periodic_return_tables(load_returns())
+
+
+periodic_tables = load_periodic_tables()
 
 # Main content area with tabs
 tab1, tab2, tab3, tab4 = st.tabs(["Portfolio Analysis", "Backtesting", "Model Explanation", "Export Options"])
@@ -109,12 +131,9 @@ with tab1:
     # Display efficient frontier for the first selected model
     for model in models_selected:
         st.subheader(f"{model}: Efficient Frontier")
-        if weights_data is not None and model in ["Minimum Variance", "Modern Portfolio Theory"]:
-            # Ensure required columns exist
-            if all(col in weights_data.columns for col in ['risk', 'return', 'sharpe_ratio']):
-                st.plotly_chart(plot_efficient_frontier(weights_data, model, include_rf))
-            else:
-                st.warning(f"Data for {model} is missing required columns ('risk', 'return', 'sharpe_ratio').")
+        if model in ["Minimum Variance", "Modern Portfolio Theory"]:
+            cloud = load_frontier_cloud(include_rf)
+            st.plotly_chart(plot_efficient_frontier(cloud, model, include_rf))
             break  # Only display one efficient frontier chart
         else:
             st.write(f"Efficient frontier for {model} will be displayed here.")
@@ -142,6 +161,7 @@ with tab2:
     if models_selected:
         returns_df = load_returns()
         performance_dict = {}
+        weights_dict = {}
         sp500_series = None
 
         # Try to extract S&P 500 returns if present
@@ -155,18 +175,12 @@ with tab2:
         for model in models_selected:
             try:
                 weights_df = load_weights(model.replace(" ", "_").lower())
-                # Prepare price data: pivot returns_df to wide format with Date index and Ticker columns
-                price_df = returns_df.pivot(index='Date', columns='Ticker', values='Daily Return')
-                # Prepare weights: use the first available date's weights
-                if 'Date' in weights_df.columns:
-                    first_date = weights_df['Date'].min()
-                    weights = weights_df[weights_df['Date'] == first_date].set_index('Ticker')['Weight']
-                else:
-                    weights = weights_df.set_index('Ticker')['Weight']
-                # Align weights to price_df columns
-                weights = weights.reindex(price_df.columns).fillna(0).values
+                # Rebalance dates as index, one column per ticker (drop the melted 'Model' label)
+                weights_df = weights_df[weights_df['Ticker'] != 'Model']
+                weights_wide = weights_df.pivot(index='Date', columns='Ticker', values='Weight').astype(float)
                 # Run backtest
-                perf = run_backtest(price_df, weights, rebalance_freq=rebalance_freq, include_rf=include_rf)
+                perf = run_backtest(returns_df, weights_wide, rebalance_freq=rebalance_freq, include_rf=include_rf)
+                weights_dict[model] = weights_wide
                 performance_dict[model] = perf
             except Exception as e:
                 st.warning(f"Backtest error for {model}: {e}")
@@ -174,6 +188,31 @@ with tab2:
         if performance_dict:
             fig = plot_backtesting_results(performance_dict, sp500_series=sp500_series)
             st.plotly_chart(fig, use_container_width=True)
+
+            # Rolling one-year VaR/CVaR for all backtested strategies, latest values
+            st.subheader("Risk Metrics (1-year rolling window)")
+            try:
+                risk_report = rolling_var_report(portfolio_returns(performance_dict), window=252)
+                st.dataframe(risk_report.iloc[-1].unstack('Metric'))
+            except ValueError as e:
+                st.warning(f"Unable to compute risk metrics: {e}")
+
+            # Per-asset contribution to the parametric VaR on the latest date
+            st.subheader("Component VaR 95% (1-year rolling window)")
+            try:
+                asset_returns = returns_df[returns_df['Ticker'] != '^GSPC']
+                component_var = pd.DataFrame({
+                    model: components.iloc[-1]
+                    for model, components in rolling_component_var(asset_returns, weights_dict, window=252).items()
+                })
+                st.dataframe(component_var[(component_var != 0).any(axis=1)])
+            except ValueError as e:
+                st.warning(f"Unable to compute component VaR: {e}")
+
+            # Strategy period returns next to the assets, shared with the export tab
+            periodic_tables = join_strategy_returns(periodic_tables, performance_dict)
+            period = st.selectbox("Return Period", list(periodic_tables), index=1)
+            st.plotly_chart(plot_return_histogram(periodic_tables[period], list(performance_dict)[:3], period=period))
         else:
             st.warning("Unable to compute backtest for selected models.")
     else:
@@ -286,11 +325,34 @@ with tab3:
             - [López de Prado, M. (2016). Building Diversified Portfolios that Outperform Out-of-Sample.](https://papers.ssrn.com/sol3/papers.cfm?abstract_id=2708678)
             - [Investopedia: Hierarchical Risk Parity](https://www.investopedia.com/terms/h/hierarchical-risk-parity-hrp.asp)
             """)
+        elif model == "Minimum CVaR":
+            st.markdown("""
+            **Minimum Conditional Value-at-Risk (CVaR)**  
+            Minimizes the expected loss on the worst days of the training window rather than the variance, using the historical daily returns as scenarios.
+
+            **Key Features:**
+            - Targets tail risk directly and does not assume normally distributed returns.
+            - Solved as a linear program; long windows are reduced to a bounded set of scenarios that keeps the worst days exactly.
+
+            **Historical Note:**  
+            The linear programming formulation was introduced by Rockafellar and Uryasev in 2000.
+
+            **References:**  
+            - [Rockafellar, R.T. & Uryasev, S. (2000). Optimization of Conditional Value-at-Risk. *Journal of Risk*, 2, 21–42.](https://doi.org/10.21314/JOR.2000.038)
+            - [Investopedia: Conditional Value at Risk](https://www.investopedia.com/terms/c/conditional_value_at_risk.asp)
+            """)
 
 with tab4:
     st.header("Export Options")
     st.info("Download portfolio allocations or summary reports.")
     st.button("Download Allocations as CSV")
+    for period, table in periodic_tables.items():
+        st.download_button(
+            f"Download {period} Returns as CSV",
+            table.to_csv().encode("utf-8"),
+            file_name=f"{period.lower()}_returns.csv",
+            mime="text/csv"
+        )
     st.button("Download Summary Report as PDF")
 
 # Sidebar: Economic Context Panel (Optional)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from utils.risk import portfolio_returns
+
+# Period aliases used for the aggregated tables
+PERIODS = {"Monthly": "M", "Quarterly": "Q", "Yearly": "Y"}
+
+
+def compound_returns(returns_wide, freq):
+    """
+    Compound daily returns into period returns for every column at once.
+
+    Args:
+        returns_wide (pd.DataFrame): Daily returns with a DatetimeIndex, one column per asset or strategy.
+        freq (str): Pandas period alias, e.g. "M", "Q" or "Y".
+
+    Returns:
+        pd.DataFrame: Compounded returns indexed by period. Periods where a column has no
+            observations are NaN.
+    """
+    periods = pd.DatetimeIndex(returns_wide.index).to_period(freq)
+    # Sum of log returns per period, then back to simple returns
+    log_returns = np.log1p(returns_wide.astype(float))
+    grouped = log_returns.groupby(periods)
+    compounded = np.expm1(grouped.sum(min_count=1))
+    compounded.index.name = "Period"
+    return compounded
+
+
+def periodic_return_tables(daily_returns, performance_dict=None, periods=PERIODS):
+    """
+    Monthly, quarterly and yearly compounded returns for all assets and backtested strategies.
+
+    Args:
+        daily_returns (pd.DataFrame): DataFrame with columns ['Date', 'Ticker', 'Daily Return'].
+        performance_dict (dict): Optional {model_name: pd.DataFrame} as returned by run_backtest.
+        periods (dict): {label: pandas period alias} of the tables to build.
+
+    Returns:
+        dict: {label: pd.DataFrame} with one row per period and one column per ticker and strategy.
+    """
+    returns_wide = daily_returns.pivot(index='Date', columns='Ticker', values='Daily Return')
+    returns_wide.index = pd.to_datetime(returns_wide.index)
+    returns_wide = returns_wide.sort_index()
+
+    tables = {label: compound_returns(returns_wide, freq) for label, freq in periods.items()}
+    if performance_dict:
+        tables = join_strategy_returns(tables, performance_dict, periods)
+    return tables
+
+
+def join_strategy_returns(tables, performance_dict, periods=PERIODS):
+    """
+    Add the compounded returns of backtested strategies to existing period tables.
+
+    Args:
+        tables (dict): {label: pd.DataFrame} as returned by periodic_return_tables.
+        performance_dict (dict): {model_name: pd.DataFrame} as returned by run_backtest.
+        periods (dict): {label: pandas period alias} matching the keys of tables.
+
+    Returns:
+        dict: New {label: pd.DataFrame} with one extra column per strategy.
+    """
+    strategy_returns = portfolio_returns(performance_dict)
+    return {
+        label: table.join(compound_returns(strategy_returns, periods[label]), how='outer')
+        for label, table in tables.items()
+    }
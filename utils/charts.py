@@ -11,16 +11,22 @@ def plot_efficient_frontier(data, model, include_rf):
 
     # Enhanced Efficient Frontier plotting with legend
     fig = go.Figure()
+    portfolios = data[~data['efficient']] if 'efficient' in data.columns else data
     fig.add_trace(go.Scatter(
-        x=data['risk'], 
-        y=data['return'], 
+        x=portfolios['risk'], 
+        y=portfolios['return'], 
         mode="markers", 
         name="Portfolios",
-        marker=dict(size=8, color=data['sharpe_ratio'], colorscale="Viridis", showscale=True)
+        marker=dict(size=8, color=portfolios['sharpe_ratio'], colorscale="Viridis", showscale=True)
     ))
+    if 'efficient' in data.columns:
+        frontier = data[data['efficient']].sort_values('risk')
+        frontier_x, frontier_y = frontier['risk'], frontier['return']
+    else:
+        frontier_x, frontier_y = [0, 1], [0, 1]
     fig.add_trace(go.Scatter(
-        x=[0, 1], 
-        y=[0, 1], 
+        x=frontier_x, 
+        y=frontier_y, 
         mode="lines", 
         name="Efficient Frontier"
     ))
@@ -89,52 +95,39 @@ def plot_rolling_metrics(data, window=30):
     )
     fig.show()
 
-def plot_quarterly_return_histogram(data, portfolios):
+def plot_return_histogram(period_returns, portfolios, period="Quarterly"):
     """
-    Plot a histogram of quarterly returns for up to three portfolio decisions.
+    Plot a histogram of periodic returns for up to three portfolios or assets.
 
     Parameters:
-    - data: pd.DataFrame containing daily returns with columns ['Date', 'Ticker', 'Daily Return'].
-    - portfolios: List of portfolio names to include in the histogram (max 3).
+    - period_returns: pd.DataFrame of compounded period returns with one column per portfolio or asset
+      (see utils.aggregation.periodic_return_tables).
+    - portfolios: List of column names to include in the histogram (max 3).
+    - period: Label of the aggregation period, used in the titles.
 
     Returns:
     - fig: Plotly figure object.
     """
-    # Load minimum variance weights
-    weights_df = pd.read_csv('/workspaces/portfolio-optimization/data/minimum_variance_weights.csv')
-    
-    # Match weights to the first date in the dataset
-    first_date = data['Date'].min()
-    weights = weights_df.loc[weights_df['Date'] == first_date].iloc[0, 1:].values  # Assuming weights_df has a 'Date' column
-
-    # Compute weighted daily returns
-    data['Weighted Return'] = data['Daily Return'] * weights[data['Ticker']].values
-
-    # Resample to quarterly returns
-    data['Date'] = pd.to_datetime(data['Date'])
-    data.set_index('Date', inplace=True)
-    quarterly_returns = data['Weighted Return'].resample('Q').sum()
-
     # Validate portfolios
-    if not isinstance(data, pd.DataFrame):
-        raise ValueError("Data must be a pandas DataFrame.")
+    if not isinstance(period_returns, pd.DataFrame):
+        raise ValueError("Period returns must be a pandas DataFrame.")
     if len(portfolios) > 3:
         raise ValueError("A maximum of three portfolios can be plotted.")
-    if not all(portfolio in data.columns for portfolio in portfolios):
+    if not all(portfolio in period_returns.columns for portfolio in portfolios):
         raise ValueError("All specified portfolios must exist in the data.")
 
-    # Plot histogram of quarterly returns
+    # Plot histogram of period returns
     fig = go.Figure()
     for portfolio in portfolios:
         fig.add_trace(go.Histogram(
-            x=quarterly_returns,
+            x=period_returns[portfolio].dropna(),
             name=portfolio,
             opacity=0.75
         ))
 
     fig.update_layout(
-        title="Quarterly Return Histogram",
-        xaxis_title="Quarterly Return",
+        title=f"{period} Return Histogram",
+        xaxis_title=f"{period} Return",
         yaxis_title="Frequency",
         barmode="overlay",
         legend_title="Portfolios"
@@ -142,6 +135,22 @@ def plot_quarterly_return_histogram(data, portfolios):
     fig.update_traces(opacity=0.6)
     return fig  # Return figure instead of showing it
 
+def plot_quarterly_return_histogram(quarterly_returns, portfolios):
+    """
+    Plot a histogram of quarterly returns for up to three portfolio decisions.
+
+    Parameters:
+    - quarterly_returns: pd.DataFrame of quarterly returns with one column per portfolio,
+      or a pd.Series for a single portfolio.
+    - portfolios: List of portfolio names to include in the histogram (max 3).
+
+    Returns:
+    - fig: Plotly figure object.
+    """
+    if isinstance(quarterly_returns, pd.Series):
+        quarterly_returns = quarterly_returns.to_frame(portfolios[0] if len(portfolios) == 1 else quarterly_returns.name)
+    return plot_return_histogram(quarterly_returns, portfolios, period="Quarterly")
+
 
 
 def plot_monthly_weights(weights_df):
@@ -1,45 +1,129 @@
 import sys
 import os
+import hashlib
 
 # Add the project root directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from utils.portfolio_optimization import optimize_portfolio
+from utils.portfolio_optimization import optimize_portfolio, optimize_from_moments
+from utils.min_variance import rolling_min_variance
+from utils.streaming_stats import read_return_chunks, streaming_window_moments
+from utils.ewma import EWMACovariance
+from utils.resampling import ResamplingPool
+from utils.cvar import cvar_scenario_report
 
 
-def compute_four_month_weights(data, models, include_rf=False):
+def _pivot_returns(data):
     """
-    Compute portfolio weights for each model every four months for the specified date range.
+    Pivot long-format returns (Date index, 'Ticker' and 'Daily Return' columns) to one column per ticker.
+    """
+    data = data.dropna(subset=['Ticker', 'Daily Return'])
+    data = data.reset_index().drop_duplicates(subset=['Date', 'Ticker']).set_index('Date')
+    return data.pivot(columns='Ticker', values='Daily Return')
+
+
+def _batched_min_variance(data, dates, models, window_months):
+    """
+    Solve "Minimum Variance" for all rebalance dates at once, if the model is requested.
+
+    Returns a dict {date: weights dict}; dates that could not be solved in the batch are
+    left out so the caller falls back to optimize_portfolio for them.
+    """
+    if "Minimum Variance" not in models:
+        return {}
+    try:
+        batch = rolling_min_variance(_pivot_returns(data), dates, window_months=window_months)
+    except Exception as e:
+        print(f"Batched minimum variance failed, falling back to per-date optimization: {e}")
+        return {}
+    return {date_i: row.to_dict() for date_i, row in batch.iterrows()}
+
+
+def compute_weights_for_dates(data, models, dates, window_months=12, include_rf=False, n_resamples=None,
+                              risk_model="sample", halflife=60, corr_halflife=None, seed=None):
+    """
+    Compute portfolio weights for each model on the given rebalance dates.
 
     Args:
-        data (pd.DataFrame): Historical price data for assets.
+        data (pd.DataFrame): Daily returns with a Date index and 'Ticker'/'Daily Return' columns.
         models (list): List of optimization models to compute weights for.
+        dates (iterable): Rebalance dates.
+        window_months (int): Length of the training window ending on each rebalance date.
         include_rf (bool): Whether to include a risk-free asset.
+        n_resamples (int): If set, number of bootstrap resamples for resampled maximum Sharpe weights.
+        risk_model (str): "sample" for window moments, or "ewma" for exponentially weighted moments
+            over the whole history up to each date (window_months is then ignored).
+        halflife (float): EWMA half-life in days for means and volatilities.
+        corr_halflife (float): EWMA half-life in days for correlations. Defaults to halflife.
+        seed (int): Seed for the bootstrap resamples, reused on every rebalance date.
 
     Returns:
         pd.DataFrame: DataFrame with weights for all models.
     """
-    # Define the date range
-    start_date = pd.Timestamp("2014-01-01")
-    end_date = pd.Timestamp("2024-12-01")
+    if risk_model == "ewma":
+        if n_resamples:
+            raise ValueError("Resampling bootstraps sample moments and cannot be combined with the EWMA risk model.")
+        return _compute_ewma_weights(data, models, dates, include_rf, halflife, corr_halflife)
+    if risk_model != "sample":
+        raise ValueError(f"Unsupported risk model: {risk_model}")
 
-    # Filter data for the specified range
-    data = data[(data.index >= pd.Timestamp("2004-01-01")) & (data.index <= end_date)]
+    weights_list = []
+    min_variance_weights = _batched_min_variance(data, dates, models, window_months=window_months)
 
-    # Generate four-month intervals
-    dates = pd.date_range(start=start_date, end=end_date, freq='4MS')  # Four-month start dates
+    # One pool for all dates, so workers keep their compiled resampling problems
+    pool = ResamplingPool() if n_resamples else None
+    try:
+        for date_i in dates:
+            window_start = date_i - pd.DateOffset(months=window_months)
+            training_data = data[(data.index > window_start) & (data.index <= date_i)]
+            for model in models:
+                try:
+                    if model == "Minimum Variance" and date_i in min_variance_weights:
+                        weights = min_variance_weights[date_i]
+                    else:
+                        weights, _, _ = optimize_portfolio(training_data, model, include_rf=include_rf,
+                                                           n_resamples=n_resamples, seed=seed, pool=pool)
+                    weights_list.append({
+                        "Date": date_i,
+                        "Model": model,
+                        **weights
+                    })
+                except Exception as e:
+                    print(f"Error optimizing for model {model} on {date_i}: {e}")
+    finally:
+        if pool is not None:
+            pool.close()
 
-    weights_list = []
+    # Convert to a single DataFrame
+    return pd.DataFrame(weights_list)
 
-    for date_i in dates:
-        # Usa solo gli ultimi 4 mesi di dati per il training
-        window_start = date_i - pd.DateOffset(months=12)
-        training_data = data[(data.index > window_start) & (data.index <= date_i)]
+
+def _compute_ewma_weights(data, models, dates, include_rf, halflife, corr_halflife):
+    """
+    Walk forward through the rebalance dates with one EWMA estimator, feeding it only the new days.
+    """
+    returns_wide = _pivot_returns(data).sort_index()
+    estimator = EWMACovariance(returns_wide.columns, halflife=halflife, corr_halflife=corr_halflife)
+
+    weights_list = []
+    start = 0
+    for date_i in sorted(dates):
+        # Only the days in (previous date, date_i] are new to the estimator
+        end = returns_wide.index.searchsorted(date_i, side='right')
+        estimator.update_frame(returns_wide.iloc[start:end])
+        start = max(start, end)
+        # Tickers with fewer than two observations so far have no usable variance
+        usable = estimator.usable_tickers
+        if not usable:
+            print(f"Not enough observations for the EWMA risk model on {date_i}")
+            continue
+        mu, S = estimator.expected_returns[usable], estimator.covariance.loc[usable, usable]
         for model in models:
             try:
-                weights, _, _ = optimize_portfolio(training_data, model, include_rf=include_rf)
+                weights, _, _ = optimize_from_moments(mu, S, model, include_rf=include_rf)
                 weights_list.append({
                     "Date": date_i,
                     "Model": model,
@@ -47,13 +131,44 @@ def compute_four_month_weights(data, models, include_rf=False):
                 })
             except Exception as e:
                 print(f"Error optimizing for model {model} on {date_i}: {e}")
+    return pd.DataFrame(weights_list)
 
-    # Convert to a single DataFrame
-    weights_df = pd.DataFrame(weights_list)
 
-    return weights_df
+def compute_four_month_weights(data, models, include_rf=False, n_resamples=None, risk_model="sample", halflife=60,
+                               corr_halflife=None, seed=None):
+    """
+    Compute portfolio weights for each model every four months for the specified date range.
+
+    Args:
+        data (pd.DataFrame): Historical price data for assets.
+        models (list): List of optimization models to compute weights for.
+        include_rf (bool): Whether to include a risk-free asset.
+        n_resamples (int): If set, number of bootstrap resamples for resampled maximum Sharpe weights.
+        risk_model (str): "sample" or "ewma" (see compute_weights_for_dates).
+        halflife (float): EWMA half-life in days for means and volatilities.
+        corr_halflife (float): EWMA half-life in days for correlations.
+        seed (int): Seed for the bootstrap resamples.
 
-def compute_rolling_weights(data, models, window_months=4, start_date=None, end_date=None, include_rf=False):
+    Returns:
+        pd.DataFrame: DataFrame with weights for all models.
+    """
+    # Define the date range
+    start_date = pd.Timestamp("2014-01-01")
+    end_date = pd.Timestamp("2024-12-01")
+
+    # Filter data for the specified range
+    data = data[(data.index >= pd.Timestamp("2004-01-01")) & (data.index <= end_date)]
+
+    # Generate four-month intervals
+    dates = pd.date_range(start=start_date, end=end_date, freq='4MS')  # Four-month start dates
+
+    # Usa solo gli ultimi 12 mesi di dati per il training
+    return compute_weights_for_dates(data, models, dates, window_months=12, include_rf=include_rf,
+                                     n_resamples=n_resamples, risk_model=risk_model, halflife=halflife,
+                                     corr_halflife=corr_halflife, seed=seed)
+
+def compute_rolling_weights(data, models, window_months=4, start_date=None, end_date=None, include_rf=False,
+                            n_resamples=None, risk_model="sample", halflife=60, corr_halflife=None, seed=None):
     """
     Calcola i pesi usando una finestra mobile di window_months mesi.
 
@@ -64,6 +179,11 @@ def compute_rolling_weights(data, models, window_months=4, start_date=None, end_
         start_date (str): The start date for the analysis (format: 'YYYY-MM-DD').
         end_date (str): The end date for the analysis (format: 'YYYY-MM-DD').
         include_rf (bool): Whether to include a risk-free asset.
+        n_resamples (int): If set, number of bootstrap resamples for resampled maximum Sharpe weights.
+        risk_model (str): "sample" or "ewma" (see compute_weights_for_dates).
+        halflife (float): EWMA half-life in days for means and volatilities.
+        corr_halflife (float): EWMA half-life in days for correlations.
+        seed (int): Seed for the bootstrap resamples.
 
     Returns:
         pd.DataFrame: DataFrame with weights for all models.
@@ -75,13 +195,47 @@ def compute_rolling_weights(data, models, window_months=4, start_date=None, end_
     data = data[(data.index >= pd.Timestamp("2004-01-01")) & (data.index <= end_date)]
     # Intervallo di rebalance: ogni window_months mesi
     dates = pd.date_range(start=start_date, end=end_date, freq=f'{window_months}MS')
+    return compute_weights_for_dates(data, models, dates, window_months=window_months, include_rf=include_rf,
+                                     n_resamples=n_resamples, risk_model=risk_model, halflife=halflife,
+                                     corr_halflife=corr_halflife, seed=seed)
+
+def compute_streaming_weights(path, models, window_months=12, start_date=None, end_date=None,
+                              include_rf=False, chunksize=1_000_000):
+    """
+    Compute weights every four months without loading the whole returns history.
+
+    The date-sorted returns file is read in chunks and the moments of every training
+    window are accumulated in a single pass (see utils.streaming_stats), then handed
+    to the optimizers. Tickers without enough observations in a window are left out
+    of that window's optimization.
+
+    Args:
+        path (str): Long-format returns CSV sorted by date.
+        models (list): List of optimization models to compute weights for.
+        window_months (int): Length of the training window ending on each rebalance date.
+        start_date (str): First rebalance date (format: 'YYYY-MM-DD').
+        end_date (str): Last rebalance date (format: 'YYYY-MM-DD').
+        include_rf (bool): Whether to include a risk-free asset.
+        chunksize (int): Number of CSV rows read at a time.
+
+    Returns:
+        pd.DataFrame: DataFrame with weights for all models.
+    """
+    start_date = pd.Timestamp(start_date or "2014-01-01")
+    end_date = pd.Timestamp(end_date or "2024-12-01")
+    dates = pd.date_range(start=start_date, end=end_date, freq='4MS')
+
     weights_list = []
-    for date_i in dates:
-        window_start = date_i - pd.DateOffset(months=window_months)
-        training_data = data[(data.index > window_start) & (data.index <= date_i)]
+    chunks = read_return_chunks(path, chunksize)
+    for date_i, moments in streaming_window_moments(chunks, dates, window_months, include_total=False):
+        mu, S = moments.mu, moments.cov
+        valid = mu.index[(np.diag(moments.count) > 1)]
+        S = S.loc[valid, valid]
+        valid = S.columns[S.notna().all()]
+        mu, S = mu[valid], S.loc[valid, valid]
         for model in models:
             try:
-                weights, _, _ = optimize_portfolio(training_data, model, include_rf=include_rf)
+                weights, _, _ = optimize_from_moments(mu, S, model, include_rf=include_rf)
                 weights_list.append({
                     "Date": date_i,
                     "Model": model,
@@ -89,8 +243,109 @@ def compute_rolling_weights(data, models, window_months=4, start_date=None, end_
                 })
             except Exception as e:
                 print(f"Error optimizing for model {model} on {date_i}: {e}")
-    weights_df = pd.DataFrame(weights_list)
-    return weights_df
+    return pd.DataFrame(weights_list)
+
+MANIFEST_COLUMNS = ["Model", "Parameters", "Window", "Date", "Fingerprint"]
+
+
+def window_fingerprint(training_data):
+    """
+    Hash of the returns in a training window, used to detect changed input data.
+    """
+    rows = training_data.reset_index()[['Date', 'Ticker', 'Daily Return']].sort_values(['Date', 'Ticker'])
+    hashed = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+    return hashlib.sha256(hashed.tobytes()).hexdigest()[:16]
+
+
+def load_manifest(path):
+    """
+    Load the manifest of computed rebalance dates, or an empty one if it does not exist.
+    """
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=MANIFEST_COLUMNS)
+    return pd.read_csv(path, parse_dates=["Date"], dtype={"Parameters": str, "Fingerprint": str})
+
+
+def update_model_weights(data, model, output_path, manifest_path, window_months=12, start_date=None,
+                         end_date=None, include_rf=False, n_resamples=None, seed=None):
+    """
+    Bring a model's weights file up to date, optimizing only missing or stale rebalance dates.
+
+    The manifest records, for each (model, parameters, window, rebalance date), the
+    fingerprint of the training data used. Dates whose fingerprint is missing or no
+    longer matches the data are recomputed; their rows replace any previous ones in
+    output_path and the rest of the file is left untouched. Dates whose training
+    window holds no returns are skipped and not recorded. Only the sample risk model
+    is supported: EWMA weights depend on the whole history, not just the window.
+
+    Args:
+        data (pd.DataFrame): Daily returns with a Date index and 'Ticker'/'Daily Return' columns.
+        model (str): Optimization model.
+        output_path (str): CSV file with the model's weights.
+        manifest_path (str): CSV manifest shared by all models.
+        window_months (int): Length of the training window ending on each rebalance date.
+        start_date (str): First rebalance date (format: 'YYYY-MM-DD').
+        end_date (str): Last rebalance date (format: 'YYYY-MM-DD'). Defaults to the last date in data.
+        include_rf (bool): Whether to include a risk-free asset.
+        n_resamples (int): If set, number of bootstrap resamples for resampled maximum Sharpe weights.
+        seed (int): Seed for the bootstrap resamples.
+
+    Returns:
+        list: Rebalance dates that were recomputed.
+    """
+    start_date = pd.Timestamp(start_date or "2014-01-01")
+    end_date = pd.Timestamp(end_date) if end_date else data.index.max()
+    data = data[(data.index >= pd.Timestamp("2004-01-01")) & (data.index <= end_date)]
+    dates = pd.date_range(start=start_date, end=end_date, freq='4MS')
+    parameters = f"include_rf={include_rf};n_resamples={n_resamples};seed={seed}"
+
+    manifest = load_manifest(manifest_path)
+    own = (manifest["Model"] == model) & (manifest["Parameters"] == parameters) & (manifest["Window"] == window_months)
+    recorded = dict(zip(manifest.loc[own, "Date"], manifest.loc[own, "Fingerprint"]))
+
+    try:
+        existing = pd.read_csv(output_path, parse_dates=["Date"])
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        existing = pd.DataFrame()
+    existing_dates = set(existing["Date"]) if not existing.empty else set()
+
+    fingerprints = {}
+    stale = []
+    for date_i in dates:
+        window_start = date_i - pd.DateOffset(months=window_months)
+        training_data = data[(data.index > window_start) & (data.index <= date_i)]
+        if training_data.empty:
+            print(f"No returns in the training window for {model} on {date_i}, skipping")
+            continue
+        fingerprints[date_i] = window_fingerprint(training_data)
+        if recorded.get(date_i) != fingerprints[date_i] or date_i not in existing_dates:
+            stale.append(date_i)
+    if not stale:
+        return []
+
+    weights = compute_weights_for_dates(data, [model], pd.DatetimeIndex(stale), window_months=window_months,
+                                        include_rf=include_rf, n_resamples=n_resamples, seed=seed)
+    if weights.empty:
+        return []
+    computed = list(weights["Date"])
+
+    if not existing.empty:
+        existing = existing[~existing["Date"].isin(computed)]
+    weights = pd.concat([existing, weights], ignore_index=True).sort_values("Date")
+    weights.to_csv(output_path, index=False, date_format="%Y-%m-%d")
+
+    # Record the new fingerprints, replacing older entries for the same dates
+    manifest = manifest[~(own & manifest["Date"].isin(computed))]
+    new_entries = pd.DataFrame({
+        "Model": model,
+        "Parameters": parameters,
+        "Window": window_months,
+        "Date": computed,
+        "Fingerprint": [fingerprints[d] for d in computed],
+    })
+    manifest = pd.concat([manifest, new_entries], ignore_index=True).sort_values(["Model", "Parameters", "Window", "Date"])
+    manifest.to_csv(manifest_path, index=False, date_format="%Y-%m-%d")
+    return computed
 
 if __name__ == "__main__":
     # Load historical daily returns data
@@ -115,19 +370,23 @@ if __name__ == "__main__":
     data = data.set_index('Date')
 
     # Define the model(s) to iterate over
-    models = ["Minimum Variance","Modern Portfolio Theory","Maximum Sharpe Ratio","Risk Parity","Hierarchical Risk Parity"]
-    # Compute weights for each model
+    models = ["Minimum Variance","Modern Portfolio Theory","Maximum Sharpe Ratio","Risk Parity","Hierarchical Risk Parity","Minimum CVaR"]
+    # Update the weights of each model, optimizing only new or changed rebalance dates
+    manifest_path = os.path.join("data", "weights_manifest.csv")
     for model in models:
         print(f"Processing model: {model}")
+        output_path = os.path.join("data", f"{model.lower().replace(' ', '_')}_weights.csv")
         try:
-            print(f"Input data: {data.head()}")
-            print(f"Calling compute_four_month_weights with include_rf=False")
-            weights = compute_four_month_weights(data, [model], include_rf=False)
+            computed = update_model_weights(data, model, output_path, manifest_path, include_rf=False)
         except Exception as e:
             print(f"Error computing weights for model {model}: {e}")
-            weights = None
-        # Save weights to a separate CSV file for each model
-        output_path = os.path.join("data", f"{model.lower().replace(' ', '_')}_weights.csv")
-        if weights is not None:
-            weights.to_csv(output_path, index=False)
-            print(f"Weights saved to {output_path}")
\ No newline at end of file
+            continue
+        if computed:
+            print(f"Weights for {len(computed)} rebalance dates saved to {output_path}")
+        else:
+            print(f"No rebalance dates to update in {output_path}")
+
+    # Accuracy and speed of the Minimum CVaR scenario reduction on the latest training window
+    latest = data[data.index > data.index.max() - pd.DateOffset(months=12)]
+    print("Minimum CVaR scenario reduction on the latest 12-month window:")
+    print(cvar_scenario_report(_pivot_returns(latest)).to_string(index=False))
@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+
+class EWMACovariance:
+    """
+    Exponentially weighted mean and covariance of daily returns, updated one day at a time.
+
+    Each new day costs a rank-one update of the N x N state:
+        d = r - mean
+        mean <- mean + (1 - lam) * d
+        cov <- lam * (cov + (1 - lam) * d d')
+    With corr_halflife set, variances use halflife and correlations use
+    corr_halflife, and the two are combined as D C D. The state can be saved and
+    restored, so a walk-forward run can resume without replaying the history.
+
+    Each ticker's mean starts at its own first observation, so tickers listed
+    before their history begins do not enter with a zero mean. Missing returns
+    leave the mean unchanged but the covariance still decays, so after a gap the
+    estimates differ from an EWMA over the observed days only.
+
+    Args:
+        tickers (list): Asset names, in the column order of the returns passed to update.
+        halflife (float): Half-life in days of the mean and volatility estimates.
+        corr_halflife (float): Half-life in days of the correlation estimate. Defaults to halflife.
+    """
+
+    def __init__(self, tickers, halflife=60, corr_halflife=None):
+        if halflife <= 0 or (corr_halflife is not None and corr_halflife <= 0):
+            raise ValueError("Half-lives must be positive.")
+        self.tickers = list(tickers)
+        self.halflife = float(halflife)
+        self.corr_halflife = float(corr_halflife) if corr_halflife else None
+        n_assets = len(self.tickers)
+        self.n_obs = 0
+        self.counts = np.zeros(n_assets, dtype=int)
+        self.last_date = None
+        self.mean = np.zeros(n_assets)
+        self.cov = np.zeros((n_assets, n_assets))
+        self.corr_mean = np.zeros(n_assets) if self.corr_halflife else None
+        self.corr_cov = np.zeros((n_assets, n_assets)) if self.corr_halflife else None
+
+    @staticmethod
+    def _decay(halflife):
+        return 0.5 ** (1.0 / halflife)
+
+    @staticmethod
+    def _step(mean, cov, r, lam, started, first):
+        # Missing returns, and a ticker's first observation, leave its deviation at zero
+        d = np.where(started, r - mean, 0.0)
+        mean += (1.0 - lam) * d
+        mean[first] = r[first]  # start the mean at the ticker's first observation
+        cov += (1.0 - lam) * np.outer(d, d)
+        cov *= lam
+
+    def update(self, returns, date=None):
+        """
+        Add one day of returns (array-like in ticker order, NaN for missing).
+        """
+        r = np.asarray(returns, dtype=float)
+        observed = ~np.isnan(r)
+        started = observed & (self.counts > 0)
+        first = observed & (self.counts == 0)
+        self._step(self.mean, self.cov, r, self._decay(self.halflife), started, first)
+        if self.corr_halflife:
+            self._step(self.corr_mean, self.corr_cov, r, self._decay(self.corr_halflife), started, first)
+        self.counts += observed
+        self.n_obs += 1
+        if date is not None:
+            self.last_date = pd.Timestamp(date)
+        return self
+
+    def update_frame(self, returns_wide):
+        """
+        Add every row of a wide returns frame (DatetimeIndex, one column per ticker) in date order.
+
+        Rows dated on or before the last update are skipped, so the same frame can be
+        replayed after restoring a checkpoint.
+        """
+        returns_wide = returns_wide.reindex(columns=self.tickers).sort_index()
+        if self.last_date is not None:
+            returns_wide = returns_wide[returns_wide.index > self.last_date]
+        for date, row in zip(returns_wide.index, returns_wide.to_numpy(dtype=float)):
+            self.update(row, date)
+        return self
+
+    @classmethod
+    def from_returns(cls, returns_wide, halflife=60, corr_halflife=None):
+        """
+        Build an estimator from a wide returns frame.
+        """
+        return cls(returns_wide.columns, halflife, corr_halflife).update_frame(returns_wide)
+
+    @property
+    def usable_tickers(self):
+        """Tickers with at least two observations, the ones with a usable variance."""
+        return [ticker for ticker, count in zip(self.tickers, self.counts) if count >= 2]
+
+    @property
+    def expected_returns(self):
+        """EWMA mean return per ticker."""
+        return pd.Series(self.mean, index=self.tickers)
+
+    @property
+    def covariance(self):
+        """EWMA covariance matrix, combining volatility and correlation half-lives if they differ."""
+        cov = self.cov
+        if self.corr_halflife:
+            vol = np.sqrt(np.diag(self.cov))
+            corr_vol = np.sqrt(np.diag(self.corr_cov))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                corr = self.corr_cov / np.outer(corr_vol, corr_vol)
+            corr = np.nan_to_num(corr)
+            np.fill_diagonal(corr, 1.0)
+            cov = corr * np.outer(vol, vol)
+        return pd.DataFrame(cov, index=self.tickers, columns=self.tickers)
+
+    def save(self, path):
+        """
+        Write the estimator state to a .npz checkpoint.
+        """
+        np.savez(
+            path,
+            tickers=np.array(self.tickers, dtype=str),
+            halflife=self.halflife,
+            corr_halflife=self.corr_halflife or 0.0,
+            n_obs=self.n_obs,
+            counts=self.counts,
+            last_date=str(self.last_date) if self.last_date is not None else "",
+            mean=self.mean,
+            cov=self.cov,
+            corr_mean=self.corr_mean if self.corr_halflife else np.zeros(0),
+            corr_cov=self.corr_cov if self.corr_halflife else np.zeros(0),
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Restore an estimator saved with save.
+        """
+        with np.load(path) as state:
+            estimator = cls(state["tickers"].tolist(), float(state["halflife"]), float(state["corr_halflife"]) or None)
+            estimator.n_obs = int(state["n_obs"])
+            # Checkpoints written before per-ticker counts existed: assume every ticker was observed
+            estimator.counts = state["counts"].copy() if "counts" in state else np.full(len(estimator.tickers), estimator.n_obs)
+            last_date = str(state["last_date"])
+            estimator.last_date = pd.Timestamp(last_date) if last_date else None
+            estimator.mean = state["mean"].copy()
+            estimator.cov = state["cov"].copy()
+            if estimator.corr_halflife:
+                estimator.corr_mean = state["corr_mean"].copy()
+                estimator.corr_cov = state["corr_cov"].copy()
+        return estimator
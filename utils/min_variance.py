@@ -0,0 +1,224 @@
+import numpy as np
+import pandas as pd
+
+
+def _project_capped_simplex(v, upper, n_iter=64):
+    """
+    Project each row of v onto {w : sum(w) = 1, 0 <= w <= upper}.
+
+    Args:
+        v (np.ndarray): Array of shape (B, N) with the points to project.
+        upper (float): Upper bound on every weight.
+        n_iter (int): Number of bisection steps on the shift parameter.
+
+    Returns:
+        np.ndarray: Projected weights with the same shape as v.
+    """
+    # The projection is clip(v - tau, 0, upper) for the tau that makes each row sum to one.
+    lo = v.min(axis=1, keepdims=True) - upper  # every weight at the cap, row sum >= 1
+    hi = v.max(axis=1, keepdims=True)  # every weight at zero, row sum = 0
+    for _ in range(n_iter):
+        tau = 0.5 * (lo + hi)
+        total = np.clip(v - tau, 0.0, upper).sum(axis=1, keepdims=True)
+        too_big = total > 1.0
+        lo = np.where(too_big, tau, lo)
+        hi = np.where(too_big, hi, tau)
+    return np.clip(v - 0.5 * (lo + hi), 0.0, upper)
+
+
+def _closed_form(cov_stack):
+    """
+    Unconstrained minimum variance weights S^-1 1 / (1' S^-1 1) for every matrix in the stack.
+
+    Returns:
+        tuple: (weights, solved) where solved is False for singular matrices (e.g. an
+            asset with constant returns); their weights are NaN and must be found iteratively.
+    """
+    n_batch, n_assets, _ = cov_stack.shape
+    ones = np.ones((n_batch, n_assets, 1))
+    solved = np.ones(n_batch, dtype=bool)
+    try:
+        x = np.linalg.solve(cov_stack, ones)[..., 0]
+    except np.linalg.LinAlgError:
+        # At least one matrix is singular: solve the others one by one
+        x = np.full((n_batch, n_assets), np.nan)
+        for b in range(n_batch):
+            try:
+                x[b] = np.linalg.solve(cov_stack[b], ones[b])[:, 0]
+            except np.linalg.LinAlgError:
+                solved[b] = False
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return x / x.sum(axis=1, keepdims=True), solved
+
+
+def _polish_active_set(cov_stack, w, upper, tol):
+    """
+    Solve the equality-constrained problem on the free set identified by w.
+
+    Assets at zero or at the cap are held fixed and the remaining weights are
+    obtained from the KKT system, which removes the residual error of the
+    iterative solver.
+
+    Returns:
+        tuple: (weights, optimal) where optimal flags the rows whose polished
+            weights satisfy the KKT conditions. Other rows keep their input weights.
+    """
+    n_assets = w.shape[1]
+    at_upper = w >= upper - tol
+    free = (w > tol) & ~at_upper
+    fixed = np.where(at_upper, upper, 0.0)
+
+    # Restrict the covariance to the free block and put ones on the diagonal elsewhere
+    mask = free[:, :, None] & free[:, None, :]
+    system = np.where(mask, cov_stack, 0.0) + np.where(~free, 1.0, 0.0)[:, :, None] * np.eye(n_assets)
+    ones_free = free.astype(float)
+    cross = -np.einsum('bij,bj->bi', cov_stack, fixed) * ones_free
+    try:
+        x = np.linalg.solve(system, ones_free[..., None])[..., 0]
+        y = np.linalg.solve(system, cross[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        # Singular free block (several zero-variance assets): any least-squares solution
+        # is checked against the KKT conditions below
+        inverse = np.linalg.pinv(system)
+        x = np.einsum('bij,bj->bi', inverse, ones_free)
+        y = np.einsum('bij,bj->bi', inverse, cross)
+        # A free block with zero variance gives x = 0: spread the free weight equally instead
+        x = np.where(np.abs(x.sum(axis=1, keepdims=True)) > tol, x, ones_free)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lam = (1.0 - fixed.sum(axis=1, keepdims=True) - y.sum(axis=1, keepdims=True)) / x.sum(axis=1, keepdims=True)
+    polished = np.where(free, lam * x + y, fixed)
+
+    # Feasibility, then the sign of the multipliers on the bound constraints
+    optimal = np.isfinite(polished).all(axis=1)
+    optimal &= (polished >= -tol).all(axis=1) & (polished <= upper + tol).all(axis=1)
+    polished = np.clip(np.nan_to_num(polished), 0.0, upper)
+    grad = np.einsum('bij,bj->bi', cov_stack, polished)
+    level = np.where(free, grad, 0.0).sum(axis=1, keepdims=True) / np.maximum(free.sum(axis=1, keepdims=True), 1)
+    slack = tol * np.abs(grad).max(axis=1, keepdims=True)
+    optimal &= np.where(polished <= tol, grad >= level - slack, True).all(axis=1)
+    optimal &= np.where(polished >= upper - tol, grad <= level + slack, True).all(axis=1)
+    return np.where(optimal[:, None], polished, w), optimal
+
+
+def batch_min_variance(cov_stack, max_allocation=None, tol=1e-8, max_iter=10000, check_every=25):
+    """
+    Solve many long-only minimum variance problems at once.
+
+    Each problem is min w' S w subject to sum(w) = 1 and 0 <= w <= max_allocation,
+    matching the constraints used by the "Minimum Variance" model in
+    optimize_portfolio. Problems whose closed-form solution already satisfies the
+    bounds are answered directly. The others are solved together with an
+    accelerated projected-gradient method; every check_every iterations the
+    active set is polished with an exact KKT solve and the problems it settles
+    are dropped from the batch.
+
+    Args:
+        cov_stack (np.ndarray): Covariance matrices with shape (dates, N, N), or a single (N, N) matrix.
+        max_allocation (float): Maximum weight per asset. Defaults to 1 (no cap).
+        tol (float): Tolerance used to identify the active bounds and to check optimality.
+        max_iter (int): Maximum number of projected-gradient iterations.
+        check_every (int): Number of iterations between active-set polishing steps.
+
+    Returns:
+        np.ndarray: Weights with shape (dates, N), or (N,) if a single matrix was given.
+    """
+    cov_stack = np.asarray(cov_stack, dtype=float)
+    single = cov_stack.ndim == 2
+    if single:
+        cov_stack = cov_stack[None]
+    if cov_stack.ndim != 3 or cov_stack.shape[1] != cov_stack.shape[2]:
+        raise ValueError("cov_stack must have shape (dates, N, N).")
+    if not np.isfinite(cov_stack).all():
+        raise ValueError("cov_stack contains missing or infinite values.")
+
+    n_assets = cov_stack.shape[1]
+    upper = 1.0 if not max_allocation else float(max_allocation)
+    if upper * n_assets < 1.0 - 1e-12:
+        raise ValueError(f"max_allocation={max_allocation} is infeasible for {n_assets} assets.")
+
+    weights, solved = _closed_form(cov_stack)
+    feasible = solved & (weights >= 0.0).all(axis=1) & (weights <= upper).all(axis=1)
+    pending = np.flatnonzero(~feasible)
+
+    if len(pending):
+        S = cov_stack[pending]
+        # Step size from the Lipschitz constant of the gradient 2 S w
+        step = 1.0 / (2.0 * np.linalg.eigvalsh(S)[:, -1:])
+        # Singular rows have no closed-form start: begin from equal weights
+        start = np.where(solved[pending, None], weights[pending], 1.0 / n_assets)
+        w = _project_capped_simplex(np.nan_to_num(start), upper)
+        z, t = w.copy(), np.ones((len(pending), 1))
+        for it in range(1, max_iter + 1):
+            grad = 2.0 * np.einsum('bij,bj->bi', S, z)
+            w_next = _project_capped_simplex(z - step * grad, upper)
+            t_next = 0.5 * (1.0 + np.sqrt(1.0 + 4.0 * t * t))
+            z = w_next + ((t - 1.0) / t_next) * (w_next - w)
+            w, t = w_next, t_next
+            if it % check_every == 0 or it == max_iter:
+                w, done = _polish_active_set(S, w, upper, tol)
+                weights[pending[done]] = w[done]
+                keep = ~done
+                if not keep.any():
+                    break
+                pending, S, step, w, z, t = pending[keep], S[keep], step[keep], w[keep], z[keep], t[keep]
+        else:
+            # Not certified optimal within max_iter: keep the best iterate
+            weights[pending] = w
+
+    return weights[0] if single else weights
+
+
+def rolling_min_variance(returns_wide, dates, window_months=12, max_allocation=None):
+    """
+    Minimum variance weights for every rebalance date using batched solves.
+
+    Tickers without enough history in a window (fewer than two observations, or a
+    covariance that cannot be estimated) are left out of that window and get a
+    weight of 0. Windows with the same set of usable tickers are solved together.
+
+    Args:
+        returns_wide (pd.DataFrame): Daily returns with a DatetimeIndex and one column per ticker.
+        dates (iterable): Rebalance dates.
+        window_months (int): Length of the training window ending on each rebalance date.
+        max_allocation (float): Maximum weight per asset.
+
+    Returns:
+        pd.DataFrame: Weights indexed by rebalance date with one column per ticker.
+            Dates whose window has fewer than two observations are skipped.
+    """
+    returns_wide = returns_wide.sort_index()
+    index = returns_wide.index
+
+    # {usable tickers: ([dates], [covariances])}
+    groups = {}
+    for date_i in dates:
+        window_start = date_i - pd.DateOffset(months=window_months)
+        start = index.searchsorted(window_start, side='right')
+        end = index.searchsorted(date_i, side='right')
+        if end - start < 2:
+            print(f"Not enough observations for minimum variance on {date_i}")
+            continue
+        window = returns_wide.iloc[start:end]
+        window = window.loc[:, window.notna().sum() >= 2]
+        cov = window.cov()
+        usable = cov.columns[~cov.isna().any()]
+        if usable.empty:
+            print(f"No ticker has enough observations for minimum variance on {date_i}")
+            continue
+        group_dates, group_covs = groups.setdefault(tuple(usable), ([], []))
+        group_dates.append(date_i)
+        group_covs.append(cov.loc[usable, usable].to_numpy())
+
+    frames = []
+    for usable, (group_dates, group_covs) in groups.items():
+        try:
+            weights = batch_min_variance(np.stack(group_covs), max_allocation=max_allocation)
+        except ValueError as e:
+            print(f"Minimum variance failed for {len(group_dates)} date(s) starting {group_dates[0]}: {e}")
+            continue
+        frames.append(pd.DataFrame(weights, index=pd.DatetimeIndex(group_dates), columns=list(usable)))
+
+    if not frames:
+        return pd.DataFrame(columns=returns_wide.columns)
+    return pd.concat(frames).reindex(columns=returns_wide.columns, fill_value=0.0).fillna(0.0).sort_index()
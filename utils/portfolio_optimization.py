@@ -1,8 +1,13 @@
 import numpy as np
 import pandas as pd
 from pypfopt import EfficientFrontier, risk_models, expected_returns, HRPOpt 
+from utils.resampling import resampled_max_sharpe
+from utils.ewma import EWMACovariance
+from utils.cvar import min_cvar_weights
 
-def optimize_portfolio(df, model, include_rf=False, max_allocation=None, no_short_selling=True):
+def optimize_portfolio(df, model, include_rf=False, max_allocation=None, no_short_selling=True,
+                       n_resamples=None, n_jobs=None, risk_model="sample", halflife=60, corr_halflife=None,
+                       seed=None, pool=None):
 
     # Ensure the index is in datetime format
     if not isinstance(df.index, pd.DatetimeIndex):
@@ -18,8 +23,50 @@ def optimize_portfolio(df, model, include_rf=False, max_allocation=None, no_shor
     df = df.pivot(columns='Ticker', values='Daily Return')
 
     # Calculate expected returns and covariance matrix
+    if risk_model == "ewma":
+        if n_resamples:
+            raise ValueError("Resampling bootstraps sample moments and cannot be combined with the EWMA risk model.")
+        estimator = EWMACovariance.from_returns(df, halflife=halflife, corr_halflife=corr_halflife)
+        usable = estimator.usable_tickers
+        mu, S = estimator.expected_returns[usable], estimator.covariance.loc[usable, usable]
+        # HRP clusters on the EWMA covariance rather than the raw returns
+        return optimize_from_moments(mu, S, model, include_rf=include_rf, max_allocation=max_allocation,
+                                     no_short_selling=no_short_selling)
+    elif risk_model != "sample":
+        raise ValueError(f"Unsupported risk model: {risk_model}")
     mu = df.mean()
     S = df.cov()
+
+    # Resampled (Michaud) weights for the maximum Sharpe models
+    if n_resamples and model in ["Modern Portfolio Theory", "Maximum Sharpe Ratio"]:
+        risk_free_rate = 0.02 if include_rf else 0.0
+        weights = resampled_max_sharpe(df, n_resamples=n_resamples, risk_free_rate=risk_free_rate,
+                                       max_allocation=max_allocation, n_jobs=n_jobs, seed=seed, pool=pool)
+        portfolio_return = np.dot(weights, mu)
+        portfolio_volatility = np.sqrt(np.dot(weights.T, np.dot(S, weights)))
+        return weights, portfolio_return, portfolio_volatility
+
+    return optimize_from_moments(mu, S, model, include_rf=include_rf, max_allocation=max_allocation,
+                                 no_short_selling=no_short_selling, returns=df)
+
+
+def optimize_from_moments(mu, S, model, include_rf=False, max_allocation=None, no_short_selling=True, returns=None):
+    """
+    Run an optimization model on precomputed expected returns and covariance.
+
+    Args:
+        mu (pd.Series): Expected daily returns per ticker.
+        S (pd.DataFrame): Covariance matrix of daily returns.
+        model (str): Name of the optimization model.
+        include_rf (bool): Whether to include a risk-free asset.
+        max_allocation (float): Maximum weight per asset.
+        no_short_selling (bool): Whether to forbid negative weights.
+        returns (pd.DataFrame): Wide daily returns the moments were computed from. Used as scenarios
+            by "Minimum CVaR" (required) and by "Hierarchical Risk Parity", which otherwise clusters on S.
+
+    Returns:
+        tuple: (weights, portfolio_return, portfolio_volatility)
+    """
     # Define hypothetical risk-free rate if flagged
     risk_free_rate = 0.02 if include_rf else None
 
@@ -48,26 +95,99 @@ def optimize_portfolio(df, model, include_rf=False, max_allocation=None, no_shor
         weights = ef.max_sharpe(risk_free_rate=risk_free_rate if include_rf else None)
         portfolio_return, portfolio_volatility, _ = ef.portfolio_performance()
     elif model == "Equal Weight":
-        weights = np.ones(len(df.columns)) / len(df.columns)  # Ensure weights is a numpy array
+        weights = np.ones(len(S.columns)) / len(S.columns)  # Ensure weights is a numpy array
         portfolio_return = np.dot(weights, mu)
         portfolio_volatility = np.sqrt(np.dot(weights.T, np.dot(S, weights)))
-        weights = pd.Series(weights, index=df.columns)  # Convert weights to a pandas Series
+        weights = pd.Series(weights, index=S.columns)  # Convert weights to a pandas Series
     elif model == "Risk Parity":
         asset_volatility = np.sqrt(np.diag(S))
         inverse_volatility = 1 / asset_volatility
         weights = inverse_volatility / np.sum(inverse_volatility)  # Ensure weights is a numpy array
         portfolio_return = np.dot(weights, mu)
         portfolio_volatility = np.sqrt(np.dot(weights.T, np.dot(S, weights)))
-        weights = pd.Series(weights, index=df.columns)  # Convert weights to a pandas Series
+        weights = pd.Series(weights, index=S.columns)  # Convert weights to a pandas Series
     elif model == "Hierarchical Risk Parity":
-        hrp = HRPOpt(df)
+        hrp = HRPOpt(returns) if returns is not None else HRPOpt(cov_matrix=S)
         weights = hrp.optimize()
         weights = pd.Series(weights)  # Ensure weights is a pandas Series
         portfolio_return = np.dot(weights, mu)
         portfolio_volatility = np.sqrt(np.dot(weights.T, np.dot(S, weights)))
+    elif model == "Minimum CVaR":
+        if returns is None:
+            raise ValueError("Minimum CVaR needs the daily return scenarios, not only mu and S.")
+        # Windows longer than 500 days are reduced to 500 scenarios to bound the LP size
+        weights = min_cvar_weights(returns, beta=0.95, max_allocation=max_allocation, n_scenarios=500)
+        portfolio_return = np.dot(weights, mu)
+        portfolio_volatility = np.sqrt(np.dot(weights.T, np.dot(S, weights)))
     else:
         raise ValueError(f"Unsupported model: {model}")
     
     # Ensure weights are returned as a pandas Series for consistency
-    weights = pd.Series(weights, index=df.columns) if not isinstance(weights, pd.Series) else weights
+    weights = pd.Series(weights, index=S.columns) if not isinstance(weights, pd.Series) else weights
     return weights, portfolio_return, portfolio_volatility
+
+
+def random_portfolio_cloud(mu, S, n_portfolios=1_000_000, chunk_size=50_000, sample_size=5_000,
+                           alpha=1.0, risk_free_rate=0.0, seed=None):
+    """
+    Sample long-only random portfolios and keep a fixed-size subset for plotting.
+
+    Weights are drawn from a Dirichlet distribution and evaluated chunk by chunk, so
+    memory does not depend on n_portfolios. A uniform reservoir sample of the
+    portfolios is kept together with every Pareto-efficient point seen (no other
+    sampled portfolio has lower risk and higher return).
+
+    Args:
+        mu (pd.Series): Expected returns per asset.
+        S (pd.DataFrame): Covariance matrix of the assets.
+        n_portfolios (int): Total number of portfolios to sample.
+        chunk_size (int): Number of portfolios evaluated per matrix product.
+        sample_size (int): Size of the uniform reservoir sample.
+        alpha (float): Dirichlet concentration; values below 1 favour concentrated portfolios.
+        risk_free_rate (float): Risk-free rate used for the Sharpe ratio, in the units of mu.
+        seed (int): Seed for the random generator.
+
+    Returns:
+        pd.DataFrame: Columns ['risk', 'return', 'sharpe_ratio', 'efficient'] as expected by
+            plot_efficient_frontier, with the efficient points sorted by risk at the end.
+    """
+    rng = np.random.default_rng(seed)
+    mu_values = np.asarray(mu, dtype=float)
+    cov = np.asarray(S, dtype=float)
+    alphas = np.full(len(mu_values), alpha)
+
+    # Reservoir as the sample_size smallest random keys seen so far
+    sample_keys = np.empty(0)
+    sample = np.empty((0, 2))
+    front = np.empty((0, 2))
+
+    remaining = n_portfolios
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        remaining -= size
+        weights = rng.dirichlet(alphas, size=size)
+        points = np.column_stack([
+            np.sqrt(np.einsum('ij,ij->i', weights @ cov, weights)),
+            weights @ mu_values,
+        ])
+
+        keys = np.concatenate([sample_keys, rng.random(size)])
+        candidates = np.concatenate([sample, points])
+        if len(keys) > sample_size:
+            keep = np.argpartition(keys, sample_size)[:sample_size]
+            keys, candidates = keys[keep], candidates[keep]
+        sample_keys, sample = keys, candidates
+
+        # Efficient points: higher return than every point with lower risk
+        merged = np.concatenate([front, points])
+        merged = merged[np.lexsort((-merged[:, 1], merged[:, 0]))]
+        best_before = np.concatenate([[-np.inf], np.maximum.accumulate(merged[:-1, 1])])
+        front = merged[merged[:, 1] > best_before]
+
+    cloud = pd.DataFrame(
+        np.concatenate([sample, front]),
+        columns=['risk', 'return']
+    )
+    cloud['sharpe_ratio'] = (cloud['return'] - risk_free_rate) / cloud['risk']
+    cloud['efficient'] = np.r_[np.zeros(len(sample), dtype=bool), np.ones(len(front), dtype=bool)]
+    return cloud
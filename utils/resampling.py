@@ -0,0 +1,197 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import cvxpy as cp
+import numpy as np
+import pandas as pd
+
+# Resamples are solved in blocks of this size; each block starts cold and warm starts
+# within itself, so the weights do not depend on how blocks are spread over workers
+_BLOCK_SIZE = 25
+
+# Per-process cache of compiled problems keyed by (shape, risk_free_rate, max_allocation)
+_problems = {}
+
+
+class _MaxSharpeProblem:
+    """
+    Long-only maximum Sharpe ratio problem compiled once and re-solved for new data.
+
+    Uses the usual change of variables y = k * w, which turns the ratio into the
+    quadratic program min ||X y||^2 s.t. (mu - rf)' y = 1, sum(y) = k, y >= 0, where
+    X holds the centered returns scaled by 1/sqrt(T - 1). X and mu are cvxpy
+    parameters, so each resample only swaps the data and warm starts from the
+    previous solution.
+    """
+
+    def __init__(self, n_obs, n_assets, risk_free_rate=0.0, max_allocation=None):
+        self.scaled_returns = cp.Parameter((n_obs, n_assets))
+        self.mu = cp.Parameter(n_assets)
+        self.y = cp.Variable(n_assets)
+        self.k = cp.Variable()
+        constraints = [
+            (self.mu - risk_free_rate) @ self.y == 1,
+            cp.sum(self.y) == self.k,
+            self.y >= 0,
+            self.k >= 0,
+        ]
+        if max_allocation:
+            constraints.append(self.y <= max_allocation * self.k)
+        self.problem = cp.Problem(cp.Minimize(cp.sum_squares(self.scaled_returns @ self.y)), constraints)
+
+    def solve(self, returns, warm_start=True):
+        """
+        Return the maximum Sharpe weights for a (T, N) returns sample, or None if not solved.
+
+        Samples where no asset beats the risk-free rate have no solution and should be
+        skipped by the caller.
+        """
+        mu = returns.mean(axis=0)
+        self.mu.value = mu
+        self.scaled_returns.value = (returns - mu) / np.sqrt(len(returns) - 1)
+        self.problem.solve(solver=cp.OSQP, warm_start=warm_start, eps_abs=1e-9, eps_rel=1e-9, max_iter=100_000)
+        if self.problem.status not in ("optimal", "optimal_inaccurate") or not self.k.value:
+            return None
+        weights = np.clip(self.y.value / self.k.value, 0.0, None)
+        return weights / weights.sum()
+
+
+def _get_problem(shape, risk_free_rate, max_allocation):
+    key = (shape, risk_free_rate, max_allocation)
+    if key not in _problems:
+        _problems[key] = _MaxSharpeProblem(shape[0], shape[1], risk_free_rate, max_allocation)
+    return _problems[key]
+
+
+def _solve_block(returns, seeds, risk_free_rate, max_allocation):
+    """
+    Solve one block of bootstrap resamples.
+
+    Returns:
+        np.ndarray: Array of shape (len(seeds), N); row k holds the weights of the resample
+            drawn with seeds[k], or NaN if it could not be solved.
+    """
+    problem = _get_problem(returns.shape, risk_free_rate, max_allocation)
+    weights = np.full((len(seeds), returns.shape[1]), np.nan)
+    warm_start = False
+    for k, seed in enumerate(seeds):
+        rng = np.random.default_rng(seed)
+        sample = returns[rng.integers(0, len(returns), size=len(returns))]
+        if (sample.mean(axis=0) <= risk_free_rate).all():
+            continue  # no asset beats the risk-free rate
+        result = problem.solve(sample, warm_start=warm_start)
+        warm_start = True
+        if result is not None:
+            weights[k] = result
+    return weights
+
+
+def _solve_shared_block(shm_name, shape, seeds, risk_free_rate, max_allocation):
+    """
+    Worker entry point: solve a block on the returns published in shared memory by the parent.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    returns = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    try:
+        return _solve_block(returns, seeds, risk_free_rate, max_allocation)
+    finally:
+        del returns  # release the buffer before closing the mapping
+        shm.close()
+
+
+class ResamplingPool:
+    """
+    Process pool for resampled optimizations, kept alive across rebalance dates.
+
+    Workers keep their compiled problems between calls, so each new training window
+    only costs publishing its returns in shared memory and re-solving. Use it as a
+    context manager, or call close() when done. With n_jobs=1 the blocks run
+    in-process with the same problem cache.
+
+    Args:
+        n_jobs (int): Number of worker processes. Defaults to the number of CPUs.
+    """
+
+    def __init__(self, n_jobs=None):
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Shut down the worker processes, if any were started.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def solve_blocks(self, values, blocks, risk_free_rate, max_allocation):
+        """
+        Solve every block of seeds on a (T, N) returns array and return the results in block order.
+        """
+        if self.n_jobs == 1 or len(blocks) == 1:
+            return [_solve_block(values, seeds, risk_free_rate, max_allocation) for seeds in blocks]
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.n_jobs)
+        shm = shared_memory.SharedMemory(create=True, size=values.nbytes)
+        try:
+            np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+            futures = [
+                self._executor.submit(_solve_shared_block, shm.name, values.shape, seeds, risk_free_rate,
+                                      max_allocation)
+                for seeds in blocks
+            ]
+            return [future.result() for future in futures]
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+def resampled_max_sharpe(returns_wide, n_resamples=500, risk_free_rate=0.0, max_allocation=None,
+                         n_jobs=None, seed=None, pool=None):
+    """
+    Resampled (Michaud) maximum Sharpe ratio weights.
+
+    The training window is bootstrapped n_resamples times (dates drawn with
+    replacement), the maximum Sharpe portfolio of every resample is solved and the
+    weights are averaged. Every resample draws from its own child of the seed, and
+    resamples are solved in fixed blocks, so a given seed gives the same weights
+    for any number of workers.
+
+    Args:
+        returns_wide (pd.DataFrame): Daily returns with one column per ticker.
+        n_resamples (int): Number of bootstrap resamples.
+        risk_free_rate (float): Risk-free rate in the units of the returns.
+        max_allocation (float): Maximum weight per asset.
+        n_jobs (int): Number of worker processes when no pool is given. Defaults to the number of CPUs.
+        seed (int): Seed for the bootstrap draws.
+        pool (ResamplingPool): Pool to reuse across calls; a temporary one is created if None.
+
+    Returns:
+        pd.Series: Averaged weights indexed by ticker.
+    """
+    returns_wide = returns_wide.dropna()
+    values = np.ascontiguousarray(returns_wide.to_numpy(dtype=np.float64))
+    if len(values) < 2:
+        raise ValueError("At least two observations are required for resampling.")
+    seeds = np.random.SeedSequence(seed).spawn(n_resamples)
+    blocks = [seeds[k:k + _BLOCK_SIZE] for k in range(0, n_resamples, _BLOCK_SIZE)]
+
+    if pool is None:
+        with ResamplingPool(n_jobs) as pool:
+            results = pool.solve_blocks(values, blocks, risk_free_rate, max_allocation)
+    else:
+        results = pool.solve_blocks(values, blocks, risk_free_rate, max_allocation)
+
+    weights = np.concatenate(results)
+    solved = ~np.isnan(weights).any(axis=1)
+    if not solved.any():
+        raise ValueError("No resample had an asset with expected return above the risk-free rate.")
+    return pd.Series(weights[solved].mean(axis=0), index=returns_wide.columns)
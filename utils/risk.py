@@ -0,0 +1,252 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+
+def portfolio_returns(performance_dict):
+    """
+    Convert backtest outputs into daily returns, one column per strategy.
+
+    Args:
+        performance_dict (dict): {model_name: pd.DataFrame} as returned by run_backtest
+            (a 'Portfolio' column of cumulative values indexed by trading date).
+
+    Returns:
+        pd.DataFrame: Daily simple returns indexed by date with one column per strategy.
+    """
+    values = {}
+    for model, perf in performance_dict.items():
+        series = perf['Portfolio'] if isinstance(perf, pd.DataFrame) else perf
+        values[model] = series.astype(float)
+    values = pd.DataFrame(values).sort_index()
+    return values.pct_change().iloc[1:]
+
+
+def _rolling_smallest(values, window, n_smallest, max_elements=2 ** 20):
+    """
+    Yield (rows, smallest) for every full window, a chunk of rows at a time.
+
+    values has shape (T, K): one column per series. smallest has shape
+    (len(rows), K, n_smallest) and holds, in ascending order, the n_smallest lowest
+    values of each series over the window ending on each row. Only this lower tail is kept: a
+    sorted buffer of a few more than n_smallest values per series. On each row,
+    only the series whose leaving or entering value falls inside the buffer are
+    touched (a small fraction when the tail is small relative to the window), and
+    a series is refilled from its raw window only when its buffer runs low.
+    """
+    n_obs, n_series = values.shape
+    size = min(window, n_smallest + 16)
+    rows = np.arange(n_series)
+    cols = np.arange(size)
+    # smallest[k, :count[k]] are the count[k] lowest values of series k in the window
+    smallest = np.full((n_series, size), np.inf)
+    count = np.zeros(n_series, dtype=int)
+    chunk = np.empty((max(max_elements // (n_series * n_smallest), 1), n_series, n_smallest))
+    filled = 0
+
+    for i in range(window - 1, n_obs):
+        if i >= window:
+            old, new = values[i - window], values[i]
+            # Drop the leaving value from the buffers that contain it
+            hit = np.flatnonzero(old <= smallest[rows, count - 1])
+            if len(hit):
+                part = smallest[hit]
+                pos = (part < old[hit, None]).sum(axis=1)[:, None]
+                shifted = np.concatenate([part[:, 1:], np.full((len(hit), 1), np.inf)], axis=1)
+                smallest[hit] = np.where(cols >= pos, shifted, part)
+                count[hit] -= 1
+            # Insert the entering value where it is below the largest buffered one
+            top = smallest[rows, np.maximum(count - 1, 0)]
+            ins = np.flatnonzero(((new < top) & (count > 0)) | (count == window - 1))
+            if len(ins):
+                part = smallest[ins]
+                value = new[ins, None]
+                pos = (part < value).sum(axis=1)[:, None]
+                shifted = np.concatenate([part[:, :1], part[:, :-1]], axis=1)
+                smallest[ins] = np.where(cols > pos, shifted, np.where(cols == pos, value, part))
+                count[ins] = np.minimum(count[ins] + 1, size)
+
+        low = np.flatnonzero(count < n_smallest)
+        if len(low):
+            lowest = values[i - window + 1:i + 1, low].T
+            if size < window:
+                lowest = np.partition(lowest, size - 1, axis=1)[:, :size]
+            smallest[low] = np.sort(lowest, axis=1)
+            count[low] = size
+
+        chunk[filled] = smallest[:, :n_smallest]
+        filled += 1
+        if filled == len(chunk) or i == n_obs - 1:
+            yield np.arange(i - filled + 1, i + 1), chunk[:filled]
+            filled = 0
+
+
+def rolling_historical_var(returns, window=250, levels=(0.95, 0.99)):
+    """
+    Historical Value-at-Risk and Conditional VaR over a rolling window.
+
+    Args:
+        returns (pd.DataFrame): Daily returns, one column per strategy or asset.
+        window (int): Number of observations in each window.
+        levels (tuple): Confidence levels, e.g. (0.95, 0.99).
+
+    Returns:
+        dict: {level: (var_df, cvar_df)} with losses reported as positive numbers and
+            NaN until the first window is full.
+    """
+    returns = returns.dropna()
+    if len(returns) < window:
+        raise ValueError(f"At least {window} observations are required, got {len(returns)}.")
+    # Row-major, so each new day is a contiguous read
+    values = np.ascontiguousarray(returns.to_numpy(dtype=float))
+
+    results, positions = {}, {}
+    for level in levels:
+        if not 0 < level < 1:
+            raise ValueError(f"Confidence level must be between 0 and 1, got {level}.")
+        results[level] = (np.full(values.shape, np.nan), np.full(values.shape, np.nan))
+        # Same linear interpolation as np.quantile; the CVaR averages the tail lowest values
+        h = (window - 1) * (1 - level)
+        lo = int(np.floor(h))
+        hi = min(lo + 1, window - 1)
+        tail = max(int(np.ceil(window * (1 - level))), 1)
+        positions[level] = (h, lo, hi, tail)
+    n_smallest = max(max(hi + 1, tail) for h, lo, hi, tail in positions.values())
+
+    for rows, smallest in _rolling_smallest(values, window, n_smallest):
+        for level, (var, cvar) in results.items():
+            h, lo, hi, tail = positions[level]
+            var[rows] = -(smallest[..., lo] + (h - lo) * (smallest[..., hi] - smallest[..., lo]))
+            cvar[rows] = -smallest[..., :tail].mean(axis=2)
+
+    return {
+        level: (
+            pd.DataFrame(var, index=returns.index, columns=returns.columns),
+            pd.DataFrame(cvar, index=returns.index, columns=returns.columns),
+        )
+        for level, (var, cvar) in results.items()
+    }
+
+
+def rolling_parametric_var(returns, window=250, levels=(0.95, 0.99)):
+    """
+    Gaussian Value-at-Risk and Conditional VaR from rolling means and standard deviations.
+
+    Args:
+        returns (pd.DataFrame): Daily returns, one column per strategy or asset.
+        window (int): Number of observations in each window.
+        levels (tuple): Confidence levels, e.g. (0.95, 0.99).
+
+    Returns:
+        dict: {level: (var_df, cvar_df)} with losses reported as positive numbers.
+    """
+    returns = returns.dropna()
+    rolling = returns.rolling(window)
+    mean, std = rolling.mean(), rolling.std()
+
+    results = {}
+    for level in levels:
+        z = NormalDist().inv_cdf(1 - level)
+        tail_density = NormalDist().pdf(z) / (1 - level)
+        results[level] = (-(mean + z * std), -(mean - tail_density * std))
+    return results
+
+
+def rolling_var_report(returns, window=250, levels=(0.95, 0.99)):
+    """
+    Historical and parametric VaR/CVaR for every strategy in one pass.
+
+    Args:
+        returns (pd.DataFrame): Daily returns, one column per strategy (see portfolio_returns).
+        window (int): Number of observations in each window.
+        levels (tuple): Confidence levels.
+
+    Returns:
+        pd.DataFrame: Indexed by date with (Strategy, Metric) columns, e.g.
+            ('Minimum Variance', 'Historical CVaR 99%').
+    """
+    frames = {}
+    for method, results in [
+        ("Historical", rolling_historical_var(returns, window, levels)),
+        ("Parametric", rolling_parametric_var(returns, window, levels)),
+    ]:
+        for level, (var, cvar) in results.items():
+            label = f"{level:.0%}"
+            frames[f"{method} VaR {label}"] = var
+            frames[f"{method} CVaR {label}"] = cvar
+
+    report = pd.concat(frames, axis=1)
+    report = report.swaplevel(axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+    report.columns.names = ['Strategy', 'Metric']
+    return report
+
+
+def rolling_component_var(daily_returns, strategy_weights, window=250, level=0.95, max_elements=2 ** 22):
+    """
+    Parametric component VaR per asset for several rebalanced portfolios at once.
+
+    The component VaR of asset i is w_i * (z * (S w)_i / sigma_p - mu_i), so the
+    components sum to the portfolio's parametric VaR. S w is obtained as
+    X'(X w) from each window's returns X, for every strategy in one batched
+    product, so the N x N covariance is never formed and the windows are
+    visited once whatever the number of strategies. Dates are processed in
+    chunks of at most max_elements window values.
+
+    Args:
+        daily_returns (pd.DataFrame): DataFrame with columns ['Date', 'Ticker', 'Daily Return'].
+        strategy_weights (dict): {strategy: pd.DataFrame} with rebalance dates as index,
+            tickers as columns and weights as values.
+        window (int): Number of observations in each window.
+        level (float): Confidence level.
+        max_elements (int): Number of window values (dates x N x window) processed at a time.
+
+    Returns:
+        dict: {strategy: pd.DataFrame} of component VaR indexed by trading date with one
+            column per ticker, NaN until the first window is full.
+    """
+    returns_wide = daily_returns.pivot(index='Date', columns='Ticker', values='Daily Return')
+    returns_wide.index = pd.to_datetime(returns_wide.index)
+    returns_wide = returns_wide.sort_index().fillna(0)
+
+    r = returns_wide.to_numpy(dtype=float)
+    n_obs, n_assets = r.shape
+    if n_obs < window:
+        raise ValueError(f"At least {window} observations are required, got {n_obs}.")
+
+    # Weights in force on each trading date (last rebalance on or before it), shape (T, M, N)
+    names = list(strategy_weights)
+    stacked = []
+    for name in names:
+        weights_df = strategy_weights[name].copy()
+        weights_df.index = pd.to_datetime(weights_df.index)
+        weights_df = weights_df.sort_index().reindex(columns=returns_wide.columns).fillna(0)
+        stacked.append(weights_df.reindex(returns_wide.index, method='ffill').fillna(0).to_numpy())
+    weights = np.stack(stacked, axis=1)
+
+    # Shift by the full-sample mean to limit cancellation; the covariance is unchanged
+    shift = r.mean(axis=0)
+    x = r - shift
+    csum = np.concatenate([np.zeros((1, n_assets)), np.cumsum(x, axis=0)])
+    means = (csum[window:] - csum[:-window]) / window  # row k: window ending on day k + window - 1
+    # windows[k] is the (N, window) block of the window ending on day k + window - 1 (a view, no copy)
+    windows = np.lib.stride_tricks.sliding_window_view(x, window, axis=0)
+
+    z = -NormalDist().inv_cdf(1 - level)
+    components = np.full(weights.shape, np.nan)
+    chunk = max(max_elements // (n_assets * window), 1)
+    for start in range(0, n_obs - window + 1, chunk):
+        block = windows[start:start + chunk]
+        rows = slice(start + window - 1, start + window - 1 + len(block))
+        mean, w = means[start:start + len(block)], weights[rows]
+        # S w = (X'(X w) - window * m (m'w)) / (window - 1) for every strategy at once
+        cov_w = (w @ block) @ block.transpose(0, 2, 1)
+        cov_w = (cov_w - window * (w @ mean[:, :, None]) * mean[:, None, :]) / (window - 1)
+        sigma = np.sqrt(np.einsum('tmi,tmi->tm', w, cov_w))[..., None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            components[rows] = w * (z * cov_w / sigma - (mean + shift)[:, None, :])
+
+    return {
+        name: pd.DataFrame(components[:, k], index=returns_wide.index, columns=returns_wide.columns)
+        for k, name in enumerate(names)
+    }
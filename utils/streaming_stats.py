@@ -0,0 +1,273 @@
+import numpy as np
+import pandas as pd
+
+
+class PairwiseMoments:
+    """
+    Mergeable mean/covariance accumulator with pairwise handling of missing values.
+
+    For every pair of tickers (i, j) it keeps the number of dates on which both are
+    observed, the mean of i over those dates and the centered co-moment, so the
+    covariance matches DataFrame.cov() (pairwise complete observations, ddof=1).
+    Chunks are combined with the parallel Welford update of Chan et al., which
+    stays accurate over long histories without keeping the raw returns. Counts are
+    stored as int32 and merges update the matrices in place.
+    """
+
+    def __init__(self, tickers=()):
+        self.tickers = list(tickers)
+        n_assets = len(self.tickers)
+        self.count = np.zeros((n_assets, n_assets), dtype=np.int32)
+        self.mean = np.zeros((n_assets, n_assets))
+        self.comoment = np.zeros((n_assets, n_assets))
+
+    @classmethod
+    def from_frame(cls, returns_wide):
+        """
+        Build the moments of a wide returns frame (one row per date, one column per ticker).
+        """
+        moments = cls()
+        moments.tickers = list(returns_wide.columns)
+        x = returns_wide.to_numpy(dtype=float)
+        observed = ~np.isnan(x)
+        n_observed = observed.sum(axis=0)
+
+        # Shift by the chunk mean before forming cross products to limit cancellation
+        shift = np.where(observed, x, 0.0).sum(axis=0) / np.maximum(n_observed, 1)
+        x = np.where(observed, x - shift, 0.0)
+        mask = observed.astype(np.float32)
+
+        count = mask.T @ mask  # exact in float32 for chunks of fewer than 2**24 dates
+        moments.count = count.astype(np.int32)
+        # mean[i, j]: mean of x_i over dates where j is also observed
+        mean = x.T @ mask
+        np.divide(mean, count, out=mean, where=count > 0)
+        del count
+        comoment = x.T @ x
+        correction = mean * mean.T
+        correction *= moments.count
+        comoment -= correction
+        del correction
+        mean += shift[:, None]
+        moments.mean, moments.comoment = mean, comoment
+        return moments
+
+    def copy(self):
+        """
+        Return an independent copy of the accumulator.
+        """
+        copied = PairwiseMoments()
+        copied.tickers = list(self.tickers)
+        copied.count, copied.mean, copied.comoment = self.count.copy(), self.mean.copy(), self.comoment.copy()
+        return copied
+
+    def _expand(self, tickers):
+        """
+        Grow the matrices in place to a superset of tickers, with zero counts for the new ones.
+        """
+        n_old, n_new = len(self.tickers), len(tickers)
+        for name in ("count", "mean", "comoment"):
+            old = getattr(self, name)
+            expanded = np.zeros((n_new, n_new), dtype=old.dtype)
+            expanded[:n_old, :n_old] = old
+            setattr(self, name, expanded)
+        self.tickers = tickers
+
+    def merge(self, other, rows_per_step=256):
+        """
+        Add the observations summarized by other to this accumulator (in place).
+
+        The update runs over blocks of rows_per_step rows, so temporaries stay at a
+        few (rows_per_step, N) arrays instead of full N x N matrices.
+        """
+        if not self.tickers:
+            copied = other.copy()
+            self.tickers, self.count, self.mean, self.comoment = (
+                copied.tickers, copied.count, copied.mean, copied.comoment)
+            return self
+
+        if other.tickers == self.tickers:
+            # Same layout: plain slices, so every block is a view
+            def at(rows, cols):
+                return rows, cols
+            idx, cols = None, slice(None)
+        else:
+            known = set(self.tickers)
+            new_tickers = [ticker for ticker in other.tickers if ticker not in known]
+            if new_tickers:
+                # New tickers are appended, so existing positions are unchanged
+                self._expand(self.tickers + new_tickers)
+            position = {ticker: k for k, ticker in enumerate(self.tickers)}
+            idx = np.array([position[ticker] for ticker in other.tickers], dtype=int)
+            at, cols = np.ix_, idx
+
+        steps = [slice(start, start + rows_per_step) for start in range(0, len(other.tickers), rows_per_step)]
+
+        def weight_of_b(rows, rows_b):
+            count_a = self.count[at(rows, cols)].astype(float)
+            count = count_a + other.count[rows_b]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return count_a, np.where(count > 0, other.count[rows_b] / count, 0.0)
+
+        # Co-moments first: the cross term needs the old means on both sides of the diagonal
+        for rows_b in steps:
+            rows = rows_b if idx is None else idx[rows_b]
+            count_a, weight_b = weight_of_b(rows, rows_b)
+            delta = other.mean[rows_b] - self.mean[at(rows, cols)]
+            delta_t = (other.mean[:, rows_b] - self.mean[at(cols, rows)]).T
+            delta *= delta_t
+            delta *= count_a * weight_b
+            delta += other.comoment[rows_b]
+            self.comoment[at(rows, cols)] += delta
+        # Then the means and counts
+        for rows_b in steps:
+            rows = rows_b if idx is None else idx[rows_b]
+            _, weight_b = weight_of_b(rows, rows_b)
+            mean = self.mean[at(rows, cols)]
+            self.mean[at(rows, cols)] = mean + (other.mean[rows_b] - mean) * weight_b
+            self.count[at(rows, cols)] += other.count[rows_b]
+        return self
+
+    @property
+    def mu(self):
+        """Mean return per ticker."""
+        count = np.diag(self.count)
+        return pd.Series(np.where(count > 0, np.diag(self.mean), np.nan), index=self.tickers)
+
+    @property
+    def cov(self):
+        """Pairwise sample covariance (ddof=1), NaN where fewer than two joint observations."""
+        cov = self.comoment / np.maximum(self.count - 1, 1)
+        cov[self.count < 2] = np.nan
+        return pd.DataFrame(cov, index=self.tickers, columns=self.tickers)
+
+
+def read_return_chunks(path, chunksize=1_000_000, exclude=("^GSPC",)):
+    """
+    Stream a long-format returns CSV as wide frames, one chunk of dates at a time.
+
+    The file must be sorted by date (columns 'Date', 'Ticker', 'Daily Return'). Rows of
+    the last date in each chunk are held back until the next chunk so that every
+    yielded frame contains complete dates.
+
+    Args:
+        path (str): Path to the CSV file.
+        chunksize (int): Number of CSV rows read at a time.
+        exclude (tuple): Tickers to skip (the S&P 500 benchmark by default).
+
+    Yields:
+        pd.DataFrame: Returns indexed by date with one column per ticker present in the chunk.
+    """
+    carry = None
+    last_date = None
+    for chunk in pd.read_csv(path, chunksize=chunksize, parse_dates=["Date"]):
+        chunk = chunk.dropna(subset=['Ticker', 'Daily Return'])
+        chunk = chunk[~chunk['Ticker'].isin(exclude)]
+        if carry is not None:
+            chunk = pd.concat([carry, chunk])
+        if chunk.empty:
+            continue
+        if last_date is not None and chunk['Date'].min() <= last_date:
+            raise ValueError("Returns source is not sorted by date; sort it by 'Date' before streaming.")
+        if not chunk['Date'].is_monotonic_increasing:
+            raise ValueError("Returns source is not sorted by date; sort it by 'Date' before streaming.")
+
+        newest = chunk['Date'].iloc[-1]
+        carry = chunk[chunk['Date'] == newest]
+        complete = chunk[chunk['Date'] < newest]
+        if not complete.empty:
+            last_date = complete['Date'].iloc[-1]
+            yield _to_wide(complete)
+
+    if carry is not None and not carry.empty:
+        yield _to_wide(carry)
+
+
+def _to_wide(rows):
+    rows = rows.drop_duplicates(subset=['Date', 'Ticker'])
+    return rows.pivot(index='Date', columns='Ticker', values='Daily Return')
+
+
+def streaming_window_moments(chunks, dates, window_months=12, include_total=True):
+    """
+    Accumulate full-history and rolling-window moments in a single pass over the chunks.
+
+    The timeline is cut into blocks at every rebalance date and every window start.
+    Each chunk updates the blocks it overlaps; a window is emitted as soon as the
+    stream has moved past its end date, and blocks no longer needed by any pending
+    window are folded into the full-history total, so memory holds at most one
+    window of block summaries plus the total. Each chunk row is summarized once.
+
+    Args:
+        chunks (iterable): Date-ordered wide returns frames, e.g. from read_return_chunks.
+        dates (iterable): Rebalance dates; each window covers (date - window_months, date].
+        window_months (int): Length of the training windows.
+        include_total (bool): Whether to also accumulate the whole history. Skipping it
+            saves one N x N accumulator and its merges.
+
+    Yields:
+        tuple: (date, PairwiseMoments) for each rebalance date in order, and finally
+            (None, PairwiseMoments) with the moments of the whole history if include_total.
+    """
+    dates = pd.DatetimeIndex(sorted(dates))
+    starts = pd.DatetimeIndex([d - pd.DateOffset(months=window_months) for d in dates])
+    boundaries = starts.union(dates)
+    # Each window is the run of blocks (boundaries[k-1], boundaries[k]] from its start to its end
+    first_block = boundaries.get_indexer(starts) + 1
+    last_block = boundaries.get_indexer(dates)
+
+    total = PairwiseMoments()
+    blocks = {}
+    pending = 0
+
+    def oldest_needed():
+        return first_block[pending] if pending < len(dates) else len(boundaries)
+
+    def ready_windows(upto):
+        nonlocal pending
+        while pending < len(dates) and dates[pending] < upto:
+            needed_later = first_block[pending + 1] if pending + 1 < len(dates) else len(boundaries)
+            window = PairwiseMoments()
+            for k in range(first_block[pending], last_block[pending] + 1):
+                if k not in blocks:
+                    continue
+                if k < needed_later:
+                    # Last use of this block: fold it into the total and let the window take it over
+                    block = blocks.pop(k)
+                    if include_total:
+                        total.merge(block)
+                    window = block if not window.tickers else window.merge(block)
+                else:
+                    window.merge(blocks[k])  # merging into an empty window copies the block
+            yield dates[pending], window
+            pending += 1
+            # Fold blocks that end before every remaining window starts into the total
+            for k in [k for k in blocks if k < oldest_needed()]:
+                block = blocks.pop(k)
+                if include_total:
+                    total.merge(block)
+
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        chunk = chunk.sort_index()
+        yield from ready_windows(chunk.index[0])
+
+        block_ids = boundaries.searchsorted(chunk.index, side='left')
+        for k in np.unique(block_ids):
+            part = PairwiseMoments.from_frame(chunk[block_ids == k])
+            # Rows before the first window or after the last rebalance date only count in the total;
+            # block rows reach the total when the block is released
+            if k == 0 or k >= len(boundaries) or k < oldest_needed():
+                if include_total:
+                    total.merge(part)
+            elif k in blocks:
+                blocks[k].merge(part)
+            else:
+                blocks[k] = part
+
+    yield from ready_windows(pd.Timestamp.max)
+    if include_total:
+        for k in sorted(blocks):
+            total.merge(blocks.pop(k))
+        yield None, total
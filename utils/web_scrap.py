@@ -27,6 +27,8 @@ def save_selected_stock_daily_returns(tickers, start_date="2004-01-01", end_date
     
     # Reshape the data for saving
     daily_returns = daily_returns.reset_index().melt(id_vars=["Date"], var_name="Ticker", value_name="Daily Return")
+    # Date-ordered rows can be streamed in chunks (see utils.streaming_stats)
+    daily_returns = daily_returns.sort_values(["Date", "Ticker"]).reset_index(drop=True)
     
     # Save daily returns to a CSV file
     daily_returns.to_csv("data/selected_stock_daily_returns.csv", index=False)